@@ -1,37 +1,93 @@
+import asyncio
 import multiprocessing
+from contextlib import contextmanager
+from multiprocessing.synchronize import Event as EventType
 from pathlib import Path
+from typing import Iterator
 
 import httpx
 import pytest
 import uvicorn
-from tenacity import retry, wait_exponential
 
 from llama_deploy.client import Client
+from llama_deploy.types.apiserver import StatusEnum
+
+APISERVER_URL = "http://127.0.0.1:4501"
+
+
+async def _serve(stop_event: EventType) -> None:
+    config = uvicorn.Config(
+        "llama_deploy.apiserver.app:app", host="127.0.0.1", port=4501
+    )
+    server = uvicorn.Server(config)
+    serve_task = asyncio.create_task(server.serve())
+    await asyncio.to_thread(stop_event.wait)
+    # Let uvicorn close connections and run the app shutdown before exiting
+    server.should_exit = True
+    await serve_task
+
+
+def run_apiserver(stop_event: EventType) -> None:
+    # uvicorn.run() would pick uvloop on its own, do the same since we own the loop here
+    try:
+        import uvloop
+    except ImportError:
+        # uvicorn[standard] doesn't install uvloop on Windows
+        asyncio.run(_serve(stop_event))
+    else:
+        uvloop.run(_serve(stop_event))
+
+
+async def _wait_ready(timeout: float) -> None:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    delay = 0.01
+    async with Client(api_server_url=APISERVER_URL) as client:
+        while True:
+            try:
+                status = await client.apiserver.status()
+                if status.status == StatusEnum.HEALTHY:
+                    return
+            except httpx.HTTPError:
+                pass
+            if loop.time() > deadline:
+                raise TimeoutError(f"API Server not ready after {timeout} seconds")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+
+
+def wait_for_healthcheck(timeout: float = 30) -> None:
+    asyncio.run(_wait_ready(timeout))
+
+
+@contextmanager
+def apiserver_process(start_method: str | None = None) -> Iterator[None]:
+    """Runs the API Server in a child process for the duration of the context."""
+    ctx = multiprocessing.get_context(start_method)
+    stop_event = ctx.Event()
+    p = ctx.Process(target=run_apiserver, args=(stop_event,))
+    p.start()
 
-
-def run_apiserver():
-    uvicorn.run("llama_deploy.apiserver.app:app", host="127.0.0.1", port=4501)
-
-
-@retry(wait=wait_exponential(min=1, max=10))
-def wait_for_healthcheck():
-    response = httpx.get("http://127.0.0.1:4501/status/")
-    response.raise_for_status()
+    try:
+        wait_for_healthcheck()
+        yield
+    finally:
+        stop_event.set()
+        p.join(timeout=5)
+        # Only fall back to signals if the graceful shutdown got stuck
+        if p.is_alive():
+            p.terminate()
+            p.join(timeout=3)
+        if p.is_alive():
+            p.kill()
+            p.join()
+        p.close()
 
 
 @pytest.fixture(scope="function")
 def apiserver():
-    ctx = multiprocessing.get_context("spawn")
-    p = ctx.Process(target=run_apiserver)
-    p.start()
-    wait_for_healthcheck()
-
-    yield
-
-    p.terminate()
-    p.join(timeout=3)
-    if p.is_alive():
-        p.kill()
+    with apiserver_process("spawn"):
+        yield
 
 
 @pytest.fixture(scope="function")
@@ -40,19 +96,10 @@ def apiserver_with_rc(monkeypatch):
     rc_path = here / "rc"
     monkeypatch.setenv("LLAMA_DEPLOY_APISERVER_RC_PATH", str(rc_path))
 
-    p = multiprocessing.Process(target=run_apiserver)
-    p.start()
-    wait_for_healthcheck()
-
-    yield
-
-    p.terminate()
-    p.join(timeout=3)
-    if p.is_alive():
-        p.kill()
-    p.close()
+    with apiserver_process():
+        yield
 
 
 @pytest.fixture
 def client():
-    return Client(api_server_url="http://127.0.0.1:4501")
+    return Client(api_server_url=APISERVER_URL)
@@ -71,6 +71,9 @@ class Deployment:
         self._contexts: dict[str, Context] = {}
         self._handlers: dict[str, WorkflowHandler] = {}
         self._handler_inputs: dict[str, str] = {}
+        self._handler_sessions: dict[str, str] = {}
+        # Set and replaced every time a new handler is registered, to wake up waiters
+        self._new_handler = asyncio.Event()
         self._config = config
         deployment_state.labels(self._name).state("ready")
 
@@ -123,8 +126,31 @@ class Deployment:
         handler_id = generate_id()
         self._handlers[handler_id] = handler
         self._handler_inputs[handler_id] = json.dumps(run_kwargs)
+        self._handler_sessions[handler_id] = session_id
+        self._new_handler.set()
+        self._new_handler = asyncio.Event()
         return handler_id, session_id
 
+    async def wait_for_handler(
+        self, handler_id: str, timeout: float
+    ) -> WorkflowHandler | None:
+        """Waits up to `timeout` seconds for the handler with the given id to be registered.
+
+        Returns:
+            The handler, or None if it didn't show up before the timeout expired.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while handler_id not in self._handlers:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+            try:
+                await asyncio.wait_for(self._new_handler.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
+        return self._handlers[handler_id]
+
     async def start(self) -> None:
         """The task that will be launched in this deployment asyncio loop.
 
@@ -10,6 +10,7 @@ from fastapi import (
     Depends,
     File,
     HTTPException,
+    Query,
     Request,
     UploadFile,
     WebSocket,
@@ -36,6 +37,9 @@ deployments_router = APIRouter(
 )
 logger = logging.getLogger(__name__)
 
+# Max seconds a request for events can be held open waiting for the task to be created
+MAX_EVENTS_WAIT = 60
+
 
 def deployment(deployment_name: str) -> Deployment:
     """FastAPI dependency to retrieve a Deployment instance"""
@@ -45,6 +49,52 @@ def deployment(deployment_name: str) -> Deployment:
     return deployment
 
 
+def _get_service_id(deployment: Deployment, task_definition: TaskDefinition) -> str:
+    """Returns the service a task should run on, raising if it can't be found."""
+    service_id = task_definition.service_id or deployment.default_service
+    if service_id is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Service is None and deployment has no default service",
+        )
+
+    if service_id not in deployment.service_names:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Service '{task_definition.service_id}' not found in deployment 'deployment_name'",
+        )
+    return service_id
+
+
+def _get_run_kwargs(task_definition: TaskDefinition) -> dict:
+    """Returns the arguments to run a task with, raising if its input isn't a JSON object."""
+    if not task_definition.input:
+        return {}
+    try:
+        run_kwargs = json.loads(task_definition.input)
+    except json.JSONDecodeError:
+        run_kwargs = None
+    if not isinstance(run_kwargs, dict):
+        raise HTTPException(status_code=400, detail="Task input must be a JSON object")
+    return run_kwargs
+
+
+def _start_task(
+    deployment: Deployment,
+    task_definition: TaskDefinition,
+    service_id: str,
+    session_id: str | None,
+    run_kwargs: dict,
+) -> None:
+    """Starts a task without waiting, filling in its task and session ids."""
+    handler_id, session_id = deployment.run_workflow_no_wait(
+        service_id=service_id, session_id=session_id, **run_kwargs
+    )
+
+    task_definition.session_id = session_id
+    task_definition.task_id = handler_id
+
+
 @deployments_router.get("/")
 async def read_deployments() -> list[DeploymentDefinition]:
     """Returns a list of active deployments."""
@@ -81,21 +131,9 @@ async def create_deployment_task(
     session_id: str | None = None,
 ) -> JSONResponse:
     """Create a task for the deployment, wait for result and delete associated session."""
+    service_id = _get_service_id(deployment, task_definition)
 
-    service_id = task_definition.service_id or deployment.default_service
-    if service_id is None:
-        raise HTTPException(
-            status_code=400,
-            detail="Service is None and deployment has no default service",
-        )
-
-    if service_id not in deployment.service_names:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Service '{task_definition.service_id}' not found in deployment 'deployment_name'",
-        )
-
-    run_kwargs = json.loads(task_definition.input) if task_definition.input else {}
+    run_kwargs = _get_run_kwargs(task_definition)
     result = await deployment.run_workflow(
         service_id=service_id, session_id=session_id, **run_kwargs
     )
@@ -109,28 +147,36 @@ async def create_deployment_task_nowait(
     session_id: str | None = None,
 ) -> TaskDefinition:
     """Create a task for the deployment but don't wait for result."""
-    service_id = task_definition.service_id or deployment.default_service
-    if service_id is None:
-        raise HTTPException(
-            status_code=400,
-            detail="Service is None and deployment has no default service",
-        )
+    service_id = _get_service_id(deployment, task_definition)
+    run_kwargs = _get_run_kwargs(task_definition)
+    _start_task(deployment, task_definition, service_id, session_id, run_kwargs)
+    return task_definition
 
-    if service_id not in deployment.service_names:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Service '{task_definition.service_id}' not found in deployment 'deployment_name'",
-        )
 
-    run_kwargs = json.loads(task_definition.input) if task_definition.input else {}
-    handler_id, session_id = deployment.run_workflow_no_wait(
-        service_id=service_id, session_id=session_id, **run_kwargs
-    )
+@deployments_router.post("/{deployment_name}/tasks/create_batch")
+async def create_deployment_tasks_nowait(
+    deployment: Annotated[Deployment, Depends(deployment)],
+    task_definitions: list[TaskDefinition],
+) -> list[TaskDefinition]:
+    """Create multiple tasks for the deployment at once but don't wait for results.
 
-    task_definition.session_id = session_id
-    task_definition.task_id = handler_id
+    Each task is started in the session set in its own definition, if any.
+    """
+    # Validate the whole batch before starting anything
+    runs = []
+    for task_definition in task_definitions:
+        service_id = _get_service_id(deployment, task_definition)
+        run_kwargs = _get_run_kwargs(task_definition)
+        session_id = task_definition.session_id
+        if session_id and session_id not in deployment._contexts:
+            raise HTTPException(
+                status_code=404, detail=f"Session '{session_id}' not found"
+            )
+        runs.append((task_definition, service_id, session_id, run_kwargs))
 
-    return task_definition
+    for task_definition, service_id, session_id, run_kwargs in runs:
+        _start_task(deployment, task_definition, service_id, session_id, run_kwargs)
+    return task_definitions
 
 
 @deployments_router.post("/{deployment_name}/tasks/{task_id}/events")
@@ -155,6 +201,7 @@ async def get_events(
     session_id: str,
     task_id: str,
     raw_event: bool = False,
+    wait: Annotated[float, Query(ge=0, le=MAX_EVENTS_WAIT)] = 0,
 ) -> StreamingResponse:
     """
     Get the stream of events from a given task and session.
@@ -162,7 +209,14 @@ async def get_events(
     Args:
         raw_event (bool, default=False): Whether to return the raw event object
             or just the event data.
+        wait (float, default=0): How many seconds to hold the connection open
+            waiting for the task to be created before returning 404, up to 60.
     """
+    handler = deployment._handlers.get(task_id)
+    if handler is None and wait > 0:
+        handler = await deployment.wait_for_handler(task_id, timeout=wait)
+    if handler is None:
+        raise HTTPException(status_code=404, detail="Task not found")
 
     async def event_stream(handler: WorkflowHandler) -> AsyncGenerator[str, None]:
         serializer = JsonSerializer()
@@ -177,7 +231,7 @@ async def get_events(
         await handler
 
     return StreamingResponse(
-        event_stream(deployment._handlers[task_id]),
+        event_stream(handler),
         media_type="application/x-ndjson",
     )
 
@@ -203,7 +257,11 @@ async def get_tasks(
     tasks: list[TaskDefinition] = []
     for task_id in deployment._handlers.keys():
         tasks.append(
-            TaskDefinition(task_id=task_id, input=deployment._handler_inputs[task_id])
+            TaskDefinition(
+                task_id=task_id,
+                input=deployment._handler_inputs[task_id],
+                session_id=deployment._handler_sessions[task_id],
+            )
         )
 
     return tasks
@@ -1,7 +1,15 @@
-from typing import Any
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
 
 import httpx
+from pydantic import PrivateAttr
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing_extensions import Self
+
+_POOL_LIMITS = httpx.Limits(
+    max_connections=100, max_keepalive_connections=50, keepalive_expiry=30
+)
 
 
 class _BaseClient(BaseSettings):
@@ -17,14 +25,80 @@ class _BaseClient(BaseSettings):
     disable_ssl: bool = False
     timeout: float | None = 120.0
     poll_interval: float = 0.5
+    # When the API Server is trusted, its responses are loaded into models without validation
+    trust_server_responses: bool = False
+
+    _http_client: httpx.AsyncClient | None = PrivateAttr(default=None)
+    _http_client_key: tuple[asyncio.AbstractEventLoop, bool] | None = PrivateAttr(
+        default=None
+    )
+    # Number of `async with` blocks currently using the pool
+    _http_client_users: int = PrivateAttr(default=0)
+
+    async def __aenter__(self) -> Self:
+        """Opens a connection pool shared by all the requests made within the `async with` block."""
+        # httpx connections are bound to the loop that opened them, so the pool can only be
+        # reused by requests running in this same loop and it must be closed before the loop
+        # goes away. Outside of the block, every request uses its own short-lived client.
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = self._new_http_client(verify=not self.disable_ssl)
+            self._http_client_key = (asyncio.get_running_loop(), not self.disable_ssl)
+            self._http_client_users = 0
+        elif self._http_client_key != (
+            asyncio.get_running_loop(),
+            not self.disable_ssl,
+        ):
+            msg = (
+                "The client's connection pool is already in use in another event loop."
+            )
+            raise RuntimeError(msg)
+
+        # Nested blocks share the pool, which is closed when leaving the outermost one
+        self._http_client_users += 1
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self._http_client_users -= 1
+        if self._http_client_users <= 0:
+            await self.aclose()
+
+    def _new_http_client(self, verify: bool) -> httpx.AsyncClient:
+        return httpx.AsyncClient(verify=verify, http2=True, limits=_POOL_LIMITS)
+
+    @asynccontextmanager
+    async def _connection(
+        self, verify: bool | None = None
+    ) -> AsyncIterator[httpx.AsyncClient]:
+        """Yields the open connection pool if it can serve this request, or a dedicated client."""
+        verify = not self.disable_ssl if verify is None else verify
+        if (
+            self._http_client is not None
+            and not self._http_client.is_closed
+            and self._http_client_key == (asyncio.get_running_loop(), verify)
+        ):
+            yield self._http_client
+        else:
+            async with self._new_http_client(verify=verify) as client:
+                yield client
 
     async def request(
         self, method: str, url: str | httpx.URL, **kwargs: Any
     ) -> httpx.Response:
-        """Performs an async HTTP request using httpx."""
-        verify = kwargs.pop("verify", True)
+        """Performs an async HTTP request using httpx.
+
+        Unless passed explicitly, `verify` and `timeout` are taken from the client settings.
+        """
+        verify = kwargs.pop("verify", None)
         timeout = kwargs.pop("timeout", self.timeout)
-        async with httpx.AsyncClient(verify=verify) as client:
+        async with self._connection(verify=verify) as client:
             response = await client.request(method, url, timeout=timeout, **kwargs)
             response.raise_for_status()
             return response
+
+    async def aclose(self) -> None:
+        """Closes the connection pool opened by this client, if any."""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+            self._http_client_key = None
+            self._http_client_users = 0
@@ -24,6 +24,15 @@ class Client(_BaseClient):
     def normal_function():
         status = client.sync.apiserver.status()
     ```
+
+    Requests made within an `async with` block share the same pool of connections:
+    ```py
+    async def many_requests():
+        async with Client() as client:
+            deployments = await client.apiserver.deployments.list()
+            for d in deployments:
+                await d.tasks.list()
+    ```
     """
 
     @property
@@ -7,15 +7,15 @@ reachable by the host executing the client code.
 """
 
 import asyncio
-import json
-from typing import Any, AsyncGenerator, TextIO
+from typing import Any, AsyncGenerator, Awaitable, TextIO, TypeVar
 
 import httpx
-from pydantic import Field
+from pydantic import Field, PrivateAttr, TypeAdapter
+from pydantic_core import from_json
 from workflows.context import JsonSerializer
 from workflows.events import Event
 
-from llama_deploy.types.apiserver import Status, StatusEnum
+from llama_deploy.types.apiserver import DeploymentDefinition, Status, StatusEnum
 from llama_deploy.types.core import (
     EventDefinition,
     SessionDefinition,
@@ -25,6 +25,38 @@ from llama_deploy.types.core import (
 
 from .model import Collection, Model
 
+_T = TypeVar("_T")
+
+# Seconds the API server should wait for a task to exist before answering 404
+EVENTS_LONG_POLL_TIMEOUT = 30
+# Upper bound to the requests in flight when fanning out over multiple deployments or batches
+MAX_CONCURRENT_REQUESTS = 32
+# Max number of tasks submitted with a single request by `TaskCollection.create_many`
+TASKS_BATCH_SIZE = 10
+
+# Request bodies are serialized by pydantic-core, we only need to set the content type
+_JSON_HEADERS = {"Content-Type": "application/json"}
+# TaskResult holds nested models, so it's always validated
+# The results endpoint returns `null` when there's nothing to return yet
+_task_result_adapter: TypeAdapter[TaskResult | None] = TypeAdapter(TaskResult | None)
+
+
+async def _aiter_ndjson(response: httpx.Response) -> AsyncGenerator[Any, None]:
+    """Decodes a stream of newline-delimited JSON straight from the response bytes."""
+    # JSON can be parsed from bytes, so we skip the text decoding and line splitting
+    # that `aiter_lines()` would do on every chunk.
+    buf = bytearray()
+    async for chunk in response.aiter_bytes():
+        buf.extend(chunk)
+        while (i := buf.find(b"\n")) != -1:
+            line = bytes(buf[:i])
+            del buf[: i + 1]
+            if line.strip():
+                yield from_json(line)
+    # The last line might not be terminated
+    if buf.strip():
+        yield from_json(bytes(buf))
+
 
 class SessionCollection(Collection):
     """A model representing a collection of session for a given deployment."""
@@ -32,6 +64,12 @@ class SessionCollection(Collection):
     deployment_id: str = Field(
         description="The ID of the deployment containing the sessions."
     )
+    _base_url: str = PrivateAttr(default="")
+
+    def model_post_init(self, __context: Any) -> None:
+        self._base_url = (
+            f"{self.client.api_server_url}/deployments/{self.deployment_id}"
+        )
 
     async def delete(self, session_id: str) -> None:
         """Deletes the session with the provided `session_id`.
@@ -42,52 +80,33 @@ class SessionCollection(Collection):
         Raises:
             HTTPException: If the session couldn't be found with the id provided.
         """
-        delete_url = f"{self.client.api_server_url}/deployments/{self.deployment_id}/sessions/delete"
+        delete_url = self._base_url + "/sessions/delete"
 
         await self.client.request(
             "POST",
             delete_url,
             params={"session_id": session_id},
-            verify=not self.client.disable_ssl,
-            timeout=self.client.timeout,
         )
 
     async def create(self) -> SessionDefinition:
         """Create a new session."""
-        create_url = f"{self.client.api_server_url}/deployments/{self.deployment_id}/sessions/create"
+        create_url = self._base_url + "/sessions/create"
 
-        r = await self.client.request(
-            "POST",
-            create_url,
-            verify=not self.client.disable_ssl,
-            timeout=self.client.timeout,
-        )
+        r = await self.client.request("POST", create_url)
 
-        return SessionDefinition(**r.json())
+        return self._load(SessionDefinition, r.content)
 
     async def list(self) -> list[SessionDefinition]:
         """Returns a collection of all the sessions in the given deployment."""
-        sessions_url = (
-            f"{self.client.api_server_url}/deployments/{self.deployment_id}/sessions"
-        )
-        r = await self.client.request(
-            "GET",
-            sessions_url,
-            verify=not self.client.disable_ssl,
-            timeout=self.client.timeout,
-        )
+        sessions_url = self._base_url + "/sessions"
+        r = await self.client.request("GET", sessions_url)
 
-        return r.json()
+        return self._load_list(SessionDefinition, r.content)
 
     async def get(self, id: str) -> SessionDefinition:
         """Gets a deployment by id."""
-        get_url = f"{self.client.api_server_url}/deployments/{self.deployment_id}/sessions/{id}"
-        await self.client.request(
-            "GET",
-            get_url,
-            verify=not self.client.disable_ssl,
-            timeout=self.client.timeout,
-        )
+        get_url = f"{self._base_url}/sessions/{id}"
+        await self.client.request("GET", get_url)
         model_class = self._prepare(SessionDefinition)
         return model_class(client=self.client, id=id)
 
@@ -99,25 +118,25 @@ class Task(Model):
         description="The ID of the deployment this task belongs to."
     )
     session_id: str = Field(description="The ID of the session this task belongs to.")
+    _task_url: str = PrivateAttr(default="")
+
+    def model_post_init(self, __context: Any) -> None:
+        self._task_url = f"{self.client.api_server_url}/deployments/{self.deployment_id}/tasks/{self.id}"
 
     async def results(self) -> TaskResult | None:
         """Returns the result of a given task."""
-        results_url = f"{self.client.api_server_url}/deployments/{self.deployment_id}/tasks/{self.id}/results"
+        results_url = self._task_url + "/results"
 
         r = await self.client.request(
             "GET",
             results_url,
-            verify=not self.client.disable_ssl,
             params={"session_id": self.session_id},
-            timeout=self.client.timeout,
         )
-        if r.json():
-            return TaskResult.model_validate(r.json())
-        return None
+        return _task_result_adapter.validate_json(r.content)
 
     async def send_event(self, ev: Event, service_name: str) -> EventDefinition:
         """Sends a human response event."""
-        url = f"{self.client.api_server_url}/deployments/{self.deployment_id}/tasks/{self.id}/events"
+        url = self._task_url + "/events"
 
         serializer = JsonSerializer()
         event_def = EventDefinition(
@@ -127,34 +146,41 @@ class Task(Model):
         r = await self.client.request(
             "POST",
             url,
-            verify=not self.client.disable_ssl,
             params={"session_id": self.session_id},
-            json=event_def.model_dump(),
-            timeout=self.client.timeout,
+            content=event_def.model_dump_json(),
+            headers=_JSON_HEADERS,
         )
-        return EventDefinition.model_validate(r.json())
+        return self._load(EventDefinition, r.content)
 
-    async def events(self) -> AsyncGenerator[dict[str, Any], None]:  # pragma: no cover
+    async def events(self) -> AsyncGenerator[dict[str, Any], None]:
         """Returns a generator object to consume the events streamed from a service."""
-        events_url = f"{self.client.api_server_url}/deployments/{self.deployment_id}/tasks/{self.id}/events"
-
-        while True:
-            try:
-                async with httpx.AsyncClient(
-                    verify=not self.client.disable_ssl
-                ) as client:
+        events_url = self._task_url + "/events"
+
+        # The server holds the request open until the task shows up, so we don't
+        # need to poll aggressively on our side. The server must give up before the
+        # client does, otherwise we'd get a timeout error instead of a 404 to retry.
+        wait: float = EVENTS_LONG_POLL_TIMEOUT
+        if self.client.timeout is not None:
+            wait = min(wait, self.client.timeout / 2)
+        params: dict[str, str | float] = {"session_id": self.session_id, "wait": wait}
+
+        # Use the client's connection pool when open, and in any case keep the same
+        # connection across retries, so that polling for a task that's not there yet
+        # doesn't pay a new handshake every time
+        async with self.client._connection() as client:
+            while True:
+                try:
                     async with client.stream(
-                        "GET", events_url, params={"session_id": self.session_id}
+                        "GET", events_url, params=params, timeout=self.client.timeout
                     ) as response:
                         response.raise_for_status()
-                        async for line in response.aiter_lines():
-                            json_line = json.loads(line)
+                        async for json_line in _aiter_ndjson(response):
                             yield json_line
                         break  # Exit the function if successful
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code != 404:
-                    raise  # Re-raise if it's not a 404 error
-                await asyncio.sleep(self.client.poll_interval)
+                except httpx.HTTPStatusError as e:
+                    if e.response.status_code != 404:
+                        raise  # Re-raise if it's not a 404 error
+                    await asyncio.sleep(self.client.poll_interval)
 
 
 class TaskCollection(Collection):
@@ -163,6 +189,12 @@ class TaskCollection(Collection):
     deployment_id: str = Field(
         description="The ID of the deployment these tasks belong to."
     )
+    _base_url: str = PrivateAttr(default="")
+
+    def model_post_init(self, __context: Any) -> None:
+        self._base_url = (
+            f"{self.client.api_server_url}/deployments/{self.deployment_id}"
+        )
 
     async def run(self, task: TaskDefinition) -> Any:
         """Runs a task and returns the results once it's done.
@@ -170,68 +202,105 @@ class TaskCollection(Collection):
         Args:
             task: The definition of the task we want to run.
         """
-        run_url = (
-            f"{self.client.api_server_url}/deployments/{self.deployment_id}/tasks/run"
-        )
+        run_url = self._base_url + "/tasks/run"
         if task.session_id:
             run_url += f"?session_id={task.session_id}"
 
         r = await self.client.request(
             "POST",
             run_url,
-            verify=not self.client.disable_ssl,
-            json=task.model_dump(),
-            timeout=self.client.timeout,
+            content=task.model_dump_json(),
+            headers=_JSON_HEADERS,
         )
 
-        return r.json()
+        return from_json(r.content)
 
     async def create(self, task: TaskDefinition) -> Task:
-        """Runs a task returns it immediately, without waiting for the results."""
-        create_url = f"{self.client.api_server_url}/deployments/{self.deployment_id}/tasks/create"
+        """Runs a task returns it immediately, without waiting for the results.
+
+        The task runs in the session set in its definition, or in a new session if none is set.
+        """
+        create_url = self._base_url + "/tasks/create"
+        if task.session_id:
+            create_url += f"?session_id={task.session_id}"
 
         r = await self.client.request(
             "POST",
             create_url,
-            verify=not self.client.disable_ssl,
-            json=task.model_dump(),
-            timeout=self.client.timeout,
-        )
-        response_fields = r.json()
-
-        model_class = self._prepare(Task)
-        return model_class(
-            client=self.client,
-            deployment_id=self.deployment_id,
-            id=response_fields["task_id"],
-            session_id=response_fields["session_id"],
+            content=task.model_dump_json(),
+            headers=_JSON_HEADERS,
         )
+        response_fields = from_json(r.content)
+        return self._task(response_fields["task_id"], response_fields["session_id"])
 
-    async def list(self) -> list[Task]:
-        """Returns the list of tasks from this collection."""
-        tasks_url = (
-            f"{self.client.api_server_url}/deployments/{self.deployment_id}/tasks"
+    async def create_many(self, tasks: list[TaskDefinition]) -> list[Task]:
+        """Runs multiple tasks and returns them immediately, without waiting for the results.
+
+        Tasks are sent to the API Server in batches of `TASKS_BATCH_SIZE`, with up to
+        `MAX_CONCURRENT_REQUESTS` batches submitted concurrently. Each task runs in the
+        session set in its definition, or in a new session if none is set.
+
+        A batch is either started as a whole or not at all, but batches are independent
+        of each other: if any of them fails, the first error is raised once all the
+        batches have been submitted, and the tasks of the other batches are left running.
+        """
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+        async def create_batch(batch: list[TaskDefinition]) -> list[Task]:
+            async with semaphore:
+                return await self._create_batch(batch)
+
+        batches = [
+            tasks[i : i + TASKS_BATCH_SIZE]
+            for i in range(0, len(tasks), TASKS_BATCH_SIZE)
+        ]
+        results = await asyncio.gather(
+            *(create_batch(b) for b in batches), return_exceptions=True
         )
+        created: list[Task] = []
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+            created.extend(result)
+        return created
+
+    async def _create_batch(self, tasks: list[TaskDefinition]) -> list[Task]:
+        create_url = self._base_url + "/tasks/create_batch"
+        # Build the JSON array by hand to reuse the per-model pydantic-core serialization
+        content = "[" + ",".join(t.model_dump_json() for t in tasks) + "]"
+
         r = await self.client.request(
-            "GET",
-            tasks_url,
-            verify=not self.client.disable_ssl,
-            timeout=self.client.timeout,
+            "POST", create_url, content=content, headers=_JSON_HEADERS
         )
-        task_model_class = self._prepare(Task)
+
+        return [
+            self._task(task_def.task_id, task_def.session_id)
+            for task_def in self._load_list(TaskDefinition, r.content)
+        ]
+
+    def _task(self, task_id: str, session_id: str | None) -> Task:
+        """Builds a task of this collection, validating it unless the server is trusted."""
+        model_class: type[Task] = self._prepare(Task)
+        fields: dict[str, Any] = {
+            "client": self.client,
+            "deployment_id": self.deployment_id,
+            "id": task_id,
+            "session_id": session_id,
+        }
+        if self.client.trust_server_responses:
+            return model_class.model_construct(**fields)
+        return model_class.model_validate(fields)
+
+    async def list(self) -> list[Task]:
+        """Fetches the tasks of this deployment, refreshing the items of the collection."""
+        tasks_url = self._base_url + "/tasks"
+        r = await self.client.request("GET", tasks_url)
         items = {
-            "id": task_model_class(
-                client=self.client,
-                id=task_def.task_id,
-                session_id=task_def.session_id,
-                deployment_id=self.deployment_id,
-            )
-            for task_def in r.json()
+            task_def.task_id: self._task(task_def.task_id, task_def.session_id)
+            for task_def in self._load_list(TaskDefinition, r.content)
         }
-        model_class = self._prepare(TaskCollection)
-        return model_class(
-            client=self.client, deployment_id=self.deployment_id, items=items
-        )
+        self.items = items
+        return list(items.values())
 
 
 class Deployment(Model):
@@ -280,23 +349,17 @@ class DeploymentCollection(Collection):
             create_url,
             files=files,
             params={"reload": reload, "local": local, "base_path": base_path},
-            verify=not self.client.disable_ssl,
-            timeout=self.client.timeout,
         )
 
         model_class = self._prepare(Deployment)
-        return model_class(client=self.client, id=r.json().get("name"))
+        deployment_def = self._load(DeploymentDefinition, r.content)
+        return model_class(client=self.client, id=deployment_def.name)
 
     async def get(self, id: str) -> Deployment:
         """Gets a deployment by id."""
         get_url = f"{self.client.api_server_url}/deployments/{id}"
         # Current version of apiserver doesn't returns anything useful in this endpoint, let's just ignore it
-        await self.client.request(
-            "GET",
-            get_url,
-            verify=not self.client.disable_ssl,
-            timeout=self.client.timeout,
-        )
+        await self.client.request("GET", get_url)
         model_class = self._prepare(Deployment)
         return model_class(client=self.client, id=id)
 
@@ -305,7 +368,10 @@ class DeploymentCollection(Collection):
         deployments_url = f"{self.client.api_server_url}/deployments/"
         r = await self.client.request("GET", deployments_url)
         model_class = self._prepare(Deployment)
-        deployments = [model_class(client=self.client, id=name) for name in r.json()]
+        deployments = [
+            model_class(client=self.client, id=d.name)
+            for d in self._load_list(DeploymentDefinition, r.content)
+        ]
         return deployments
 
 
@@ -317,12 +383,7 @@ class ApiServer(Model):
         status_url = f"{self.client.api_server_url}/status/"
 
         try:
-            r = await self.client.request(
-                "GET",
-                status_url,
-                verify=not self.client.disable_ssl,
-                timeout=self.client.timeout,
-            )
+            r = await self.client.request("GET", status_url)
         except httpx.ConnectError:
             return Status(
                 status=StatusEnum.DOWN,
@@ -330,16 +391,14 @@ class ApiServer(Model):
             )
 
         if r.status_code >= 400:
-            body = r.json()
             return Status(status=StatusEnum.UNHEALTHY, status_message=r.text)
 
         description = "LlamaDeploy is up and running."
-        body = r.json()
+        body = from_json(r.content)
         deployments = body.get("deployments") or []
         if deployments:
-            description += "\nActive deployments:"
-            for d in deployments:
-                description += f"\n- {d}"
+            description += "\nActive deployments:\n"
+            description += "\n".join(f"- {d}" for d in deployments)
         else:
             description += "\nCurrently there are no active deployments"
 
@@ -349,6 +408,32 @@ class ApiServer(Model):
             deployments=deployments,
         )
 
+    async def all_with_children(
+        self,
+    ) -> list[tuple[Deployment, list[Task], list[SessionDefinition]]]:
+        """Returns all the active deployments, along with their tasks and sessions.
+
+        Tasks and sessions for the different deployments are fetched concurrently.
+        """
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+        async def limited(request: Awaitable[_T]) -> _T:
+            async with semaphore:
+                return await request
+
+        # We're already running in a coroutine, so we call the async methods from the
+        # base classes directly: this works for both the sync and the async API.
+        deployments = await DeploymentCollection.list(self.deployments)
+        tasks, sessions = await asyncio.gather(
+            asyncio.gather(
+                *(limited(TaskCollection.list(d.tasks)) for d in deployments)
+            ),
+            asyncio.gather(
+                *(limited(SessionCollection.list(d.sessions)) for d in deployments)
+            ),
+        )
+        return list(zip(deployments, tasks, sessions))
+
     @property
     def deployments(self) -> DeploymentCollection:
         """Returns a collection of deployments currently active in the API Server."""
@@ -1,14 +1,25 @@
 import asyncio
+import functools
 import inspect
 from typing import Any, AsyncGenerator, Callable, Generic, TypeVar
 
 from asgiref.sync import async_to_sync
-from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, TypeAdapter
+from pydantic_core import from_json
 from typing_extensions import ParamSpec
 
 from llama_deploy.client.base import _BaseClient
 
 
+# Generic type for the models loaded from API Server responses
+_M = TypeVar("_M", bound=BaseModel)
+
+
+@functools.cache
+def _list_adapter(model_class: type[_M]) -> TypeAdapter[list[_M]]:
+    return TypeAdapter(list[model_class])  # type: ignore[valid-type]
+
+
 class _Base(BaseModel):
     """The base model provides fields and functionalities common to derived models and collections."""
 
@@ -22,6 +33,18 @@ class _Base(BaseModel):
             return make_sync(_class)
         return _class
 
+    def _load(self, model_class: type[_M], content: bytes) -> _M:
+        """Loads a model from the raw body of an API Server response."""
+        if self.client.trust_server_responses:
+            return model_class.model_construct(**from_json(content))
+        return model_class.model_validate_json(content)
+
+    def _load_list(self, model_class: type[_M], content: bytes) -> list[_M]:
+        """Loads a list of models from the raw body of an API Server response."""
+        if self.client.trust_server_responses:
+            return [model_class.model_construct(**d) for d in from_json(content)]
+        return _list_adapter(model_class).validate_json(content)
+
 
 T = TypeVar("T", bound=_Base)
 
@@ -176,6 +176,122 @@ def test_create_deployment_task(
     assert response.status_code == 200
 
 
+@pytest.mark.parametrize("input", ["not json", "[1, 2]"])
+def test_create_deployment_task_invalid_input(
+    http_client: TestClient, data_path: Path, mock_manager: MagicMock, input: str
+) -> None:
+    deployment = mock.MagicMock()
+    deployment.default_service = "TestService"
+    deployment.service_names = ["TestService"]
+    mock_manager.get_deployment.return_value = deployment
+
+    response = http_client.post(
+        "/deployments/test-deployment/tasks/create/",
+        json={"input": input},
+    )
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Task input must be a JSON object"}
+    deployment.run_workflow_no_wait.assert_not_called()
+
+
+@pytest.mark.parametrize("input", ["not json", "[1, 2]"])
+def test_run_task_invalid_input(
+    http_client: TestClient, data_path: Path, mock_manager: MagicMock, input: str
+) -> None:
+    deployment = mock.AsyncMock()
+    deployment.default_service = "TestService"
+    deployment.service_names = ["TestService"]
+    mock_manager.get_deployment.return_value = deployment
+
+    response = http_client.post(
+        "/deployments/test-deployment/tasks/run/",
+        json={"input": input},
+    )
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Task input must be a JSON object"}
+    deployment.run_workflow.assert_not_awaited()
+
+
+def test_create_deployment_tasks_batch(
+    http_client: TestClient, data_path: Path, mock_manager: MagicMock
+) -> None:
+    deployment = mock.MagicMock()
+    deployment.default_service = "TestService"
+    deployment.service_names = ["TestService"]
+    deployment.run_workflow_no_wait.side_effect = [("t1", "s1"), ("t2", "s2")]
+    deployment._contexts = {"s2": mock.MagicMock()}
+    mock_manager.get_deployment.return_value = deployment
+
+    response = http_client.post(
+        "/deployments/test-deployment/tasks/create_batch",
+        json=[{"input": "{}"}, {"input": '{"foo": "bar"}', "session_id": "s2"}],
+    )
+    assert response.status_code == 200
+    tds = [TaskDefinition(**td) for td in response.json()]
+    assert [(td.task_id, td.session_id) for td in tds] == [("t1", "s1"), ("t2", "s2")]
+    deployment.run_workflow_no_wait.assert_has_calls(
+        [
+            mock.call(service_id="TestService", session_id=None),
+            mock.call(service_id="TestService", session_id="s2", foo="bar"),
+        ]
+    )
+
+
+def test_create_deployment_tasks_batch_service_not_found(
+    http_client: TestClient, data_path: Path, mock_manager: MagicMock
+) -> None:
+    deployment = mock.MagicMock()
+    deployment.service_names = ["TestService"]
+    mock_manager.get_deployment.return_value = deployment
+
+    response = http_client.post(
+        "/deployments/test-deployment/tasks/create_batch",
+        json=[{"input": "{}"}, {"input": "{}", "service_id": "bar"}],
+    )
+    assert response.status_code == 404
+    # Nothing was started
+    deployment.run_workflow_no_wait.assert_not_called()
+
+
+def test_create_deployment_tasks_batch_session_not_found(
+    http_client: TestClient, data_path: Path, mock_manager: MagicMock
+) -> None:
+    deployment = mock.MagicMock()
+    deployment.default_service = "TestService"
+    deployment.service_names = ["TestService"]
+    deployment._contexts = {}
+    mock_manager.get_deployment.return_value = deployment
+
+    response = http_client.post(
+        "/deployments/test-deployment/tasks/create_batch",
+        json=[{"input": "{}"}, {"input": "{}", "session_id": "missing"}],
+    )
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Session 'missing' not found"}
+    deployment.run_workflow_no_wait.assert_not_called()
+
+
+def test_create_deployment_tasks_batch_invalid_input(
+    http_client: TestClient, data_path: Path, mock_manager: MagicMock
+) -> None:
+    deployment = mock.MagicMock()
+    deployment.default_service = "TestService"
+    deployment.service_names = ["TestService"]
+    mock_manager.get_deployment.return_value = deployment
+
+    response = http_client.post(
+        "/deployments/test-deployment/tasks/create_batch",
+        json=[{"input": "{}"}, {"input": "not json"}],
+    )
+    assert response.status_code == 400
+    response = http_client.post(
+        "/deployments/test-deployment/tasks/create_batch",
+        json=[{"input": "{}"}, {"input": "[1, 2]"}],
+    )
+    assert response.status_code == 400
+    deployment.run_workflow_no_wait.assert_not_called()
+
+
 def test_send_event_not_found(
     http_client: TestClient, data_path: Path, mock_manager: MagicMock
 ) -> None:
@@ -229,6 +345,45 @@ def test_get_event_not_found(
     assert response.status_code == 404
 
 
+def test_get_event_task_not_found(
+    http_client: TestClient, data_path: Path, mock_manager: MagicMock
+) -> None:
+    deployment = mock.AsyncMock()
+    deployment._handlers = {}
+    deployment.wait_for_handler.return_value = None
+    mock_manager.get_deployment.return_value = deployment
+
+    response = http_client.get(
+        "/deployments/test-deployment/tasks/test_task_id/events",
+        params={"session_id": "42"},
+    )
+    assert response.status_code == 404
+    deployment.wait_for_handler.assert_not_awaited()
+
+    response = http_client.get(
+        "/deployments/test-deployment/tasks/test_task_id/events",
+        params={"session_id": "42", "wait": 5},
+    )
+    assert response.status_code == 404
+    deployment.wait_for_handler.assert_awaited_once_with("test_task_id", timeout=5)
+
+
+@pytest.mark.parametrize("wait", [-1, 61])
+def test_get_event_wait_out_of_range(
+    http_client: TestClient, data_path: Path, mock_manager: MagicMock, wait: float
+) -> None:
+    deployment = mock.AsyncMock()
+    deployment._handlers = {}
+    mock_manager.get_deployment.return_value = deployment
+
+    response = http_client.get(
+        "/deployments/test-deployment/tasks/test_task_id/events",
+        params={"session_id": "42", "wait": wait},
+    )
+    assert response.status_code == 422
+    deployment.wait_for_handler.assert_not_awaited()
+
+
 @pytest.mark.asyncio
 async def test_get_event_stream(
     http_client: TestClient, data_path: Path, mock_manager: MagicMock
@@ -342,6 +497,7 @@ def test_get_tasks(
     deployment = mock.AsyncMock()
     deployment._handlers = {"task1": mock.MagicMock()}
     deployment._handler_inputs = {"task1": "foo"}
+    deployment._handler_sessions = {"task1": "session1"}
     mock_manager.get_deployment.return_value = deployment
 
     response = http_client.get(
@@ -350,6 +506,7 @@ def test_get_tasks(
     assert response.status_code == 200
     assert len(response.json()) == 1
     assert response.json()[0]["input"] == "foo"
+    assert response.json()[0]["session_id"] == "session1"
 
 
 def test_get_task_result(
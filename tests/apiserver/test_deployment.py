@@ -789,6 +789,7 @@ def test_run_workflow_no_wait_without_session_id(
         assert deployment._handlers["handler_123"] == mock_handler
         assert deployment._contexts["session_456"] == mock_context
         assert deployment._handler_inputs["handler_123"] == json.dumps(test_kwargs)
+        assert deployment._handler_sessions["handler_123"] == "session_456"
 
         mock_workflow.run.assert_called_once_with(**test_kwargs)
 
@@ -827,6 +828,7 @@ def test_run_workflow_no_wait_with_session_id(
         assert session_id == "existing_session"
         assert deployment._handlers["handler_789"] == mock_handler
         assert deployment._handler_inputs["handler_789"] == json.dumps(test_kwargs)
+        assert deployment._handler_sessions["handler_789"] == "existing_session"
 
         # Context should not be modified since session existed
         assert deployment._contexts["existing_session"] == mock_context
@@ -913,3 +915,29 @@ async def test_run_workflow_session_not_found(
 
     with pytest.raises(KeyError):
         await deployment.run_workflow("test_service", "nonexistent_session")
+
+
+@pytest.mark.asyncio
+async def test_wait_for_handler(
+    deployment_config: DeploymentConfig, tmp_path: Path
+) -> None:
+    deployment = Deployment(
+        config=deployment_config, base_path=Path(), deployment_path=tmp_path
+    )
+    mock_workflow = mock.MagicMock(spec=Workflow)
+    mock_handler = mock.MagicMock(spec=WorkflowHandler)
+    mock_workflow.run.return_value = mock_handler
+    deployment._workflow_services = {"test_service": mock_workflow}
+
+    assert await deployment.wait_for_handler("handler_123", timeout=0.01) is None
+
+    with mock.patch(
+        "llama_deploy.apiserver.deployment.generate_id"
+    ) as mock_generate_id:
+        mock_generate_id.side_effect = ["session_456", "handler_123"]
+        waiter = asyncio.create_task(
+            deployment.wait_for_handler("handler_123", timeout=5)
+        )
+        await asyncio.sleep(0)
+        deployment.run_workflow_no_wait("test_service")
+        assert await waiter == mock_handler
@@ -1,10 +1,16 @@
+import asyncio
 import io
+import json
 from typing import Any
 from unittest import mock
 
 import httpx
 import pytest
+from pydantic import TypeAdapter, ValidationError
+from workflows.events import Event
 
+from llama_deploy.apiserver.routers.deployments import get_tasks
+from llama_deploy.client import Client
 from llama_deploy.client.models.apiserver import (
     ApiServer,
     Deployment,
@@ -12,8 +18,14 @@ from llama_deploy.client.models.apiserver import (
     SessionCollection,
     Task,
     TaskCollection,
+    _aiter_ndjson,
+)
+from llama_deploy.types import (
+    EventDefinition,
+    SessionDefinition,
+    TaskDefinition,
+    TaskResult,
 )
-from llama_deploy.types import SessionDefinition, TaskDefinition, TaskResult
 
 
 @pytest.mark.asyncio
@@ -28,27 +40,22 @@ async def test_session_collection_delete(client: Any) -> None:
         "POST",
         "http://localhost:4501/deployments/a_deployment/sessions/delete",
         params={"session_id": "a_session"},
-        timeout=120.0,
-        verify=True,
     )
 
 
 @pytest.mark.asyncio
 async def test_session_collection_create(client: Any) -> None:
-    client.request.return_value = mock.MagicMock(
-        json=lambda: {"session_id": "a_session"}
-    )
+    client.request.return_value = mock.MagicMock(content=b'{"session_id": "a_session"}')
     coll = SessionCollection(
         client=client,
         items={},
         deployment_id="a_deployment",
     )
-    await coll.create()
+    session_def = await coll.create()
+    assert session_def == SessionDefinition(session_id="a_session")
     client.request.assert_awaited_with(
         "POST",
         "http://localhost:4501/deployments/a_deployment/sessions/create",
-        verify=True,
-        timeout=120.0,
     )
 
 
@@ -56,10 +63,7 @@ async def test_session_collection_create(client: Any) -> None:
 async def test_session_collection_list(client: Any) -> None:
     # Mock response containing list of sessions
     client.request.return_value = mock.MagicMock(
-        json=lambda: [
-            SessionDefinition(session_id="session1"),
-            SessionDefinition(session_id="session2"),
-        ]
+        content=b'[{"session_id": "session1"}, {"session_id": "session2"}]'
     )
 
     # Create session collection instance
@@ -76,8 +80,6 @@ async def test_session_collection_list(client: Any) -> None:
     client.request.assert_awaited_with(
         "GET",
         "http://localhost:4501/deployments/a_deployment/sessions",
-        verify=True,
-        timeout=120.0,
     )
 
     # Verify returned sessions
@@ -90,7 +92,7 @@ async def test_session_collection_list(client: Any) -> None:
 @pytest.mark.asyncio
 async def test_task_results(client: Any) -> None:
     res = TaskResult(task_id="a_result", history=[], result="some_text", data={})
-    client.request.return_value = mock.MagicMock(json=lambda: res.model_dump())
+    client.request.return_value = mock.MagicMock(content=res.model_dump_json())
 
     t = Task(
         client=client,
@@ -98,20 +100,129 @@ async def test_task_results(client: Any) -> None:
         deployment_id="a_deployment",
         session_id="a_session",
     )
-    await t.results()
+    assert await t.results() == res
 
     client.request.assert_awaited_with(
         "GET",
         "http://localhost:4501/deployments/a_deployment/tasks/a_task/results",
-        verify=True,
         params={"session_id": "a_session"},
-        timeout=120.0,
     )
 
 
+@pytest.mark.asyncio
+async def test_task_results_none(client: Any) -> None:
+    client.request.return_value = mock.MagicMock(content=b"null")
+
+    t = Task(
+        client=client,
+        id="a_task",
+        deployment_id="a_deployment",
+        session_id="a_session",
+    )
+    assert await t.results() is None
+
+
+@pytest.mark.asyncio
+async def test_task_send_event(client: Any) -> None:
+    ev_def = EventDefinition(service_id="a_service", event_obj_str="{}")
+    client.request.return_value = mock.MagicMock(content=ev_def.model_dump_json())
+
+    t = Task(
+        client=client,
+        id="a_task",
+        deployment_id="a_deployment",
+        session_id="a_session",
+    )
+    with mock.patch(
+        "llama_deploy.client.models.apiserver.JsonSerializer"
+    ) as serializer:
+        serializer.return_value.serialize.return_value = "{}"
+        assert await t.send_event(Event(), "a_service") == ev_def
+
+    client.request.assert_awaited_with(
+        "POST",
+        "http://localhost:4501/deployments/a_deployment/tasks/a_task/events",
+        params={"session_id": "a_session"},
+        content='{"service_id":"a_service","event_obj_str":"{}"}',
+        headers={"Content-Type": "application/json"},
+    )
+
+
+@pytest.mark.asyncio
+async def test_task_events_reuse_pool(monkeypatch: Any) -> None:
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if len(requests) == 1:
+            return httpx.Response(404)
+        return httpx.Response(200, content=b'{"a": 1}\n{"b": 2}\n')
+
+    new_http_client = mock.MagicMock(
+        side_effect=lambda verify: httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        )
+    )
+    monkeypatch.setattr(Client, "_new_http_client", new_http_client)
+
+    async with Client(poll_interval=0) as client:
+        t = Task(
+            client=client,
+            id="a_task",
+            deployment_id="a_deployment",
+            session_id="a_session",
+        )
+        assert [ev async for ev in t.events()] == [{"a": 1}, {"b": 2}]
+
+    new_http_client.assert_called_once()
+    assert len(requests) == 2
+    assert requests[1].url.path == "/deployments/a_deployment/tasks/a_task/events"
+    assert requests[1].url.params["session_id"] == "a_session"
+    assert requests[1].url.params["wait"] == "30"
+
+
+@pytest.mark.asyncio
+async def test_task_events_wait_within_timeout(monkeypatch: Any) -> None:
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, content=b"")
+
+    monkeypatch.setattr(
+        Client,
+        "_new_http_client",
+        lambda self, verify: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+
+    t = Task(
+        client=Client(timeout=10),
+        id="a_task",
+        deployment_id="a_deployment",
+        session_id="a_session",
+    )
+    assert [ev async for ev in t.events()] == []
+    assert requests[0].url.params["wait"] == "5.0"
+
+
+@pytest.mark.asyncio
+async def test_aiter_ndjson() -> None:
+    async def aiter_bytes() -> Any:
+        for chunk in [b'{"a": 1}\n{"b"', b": [1, 2]}\n", b"\n", b'"c"\n{"d": null}']:
+            yield chunk
+
+    response = mock.MagicMock(aiter_bytes=aiter_bytes)
+    assert [line async for line in _aiter_ndjson(response)] == [
+        {"a": 1},
+        {"b": [1, 2]},
+        "c",
+        {"d": None},
+    ]
+
+
 @pytest.mark.asyncio
 async def test_task_collection_run(client: Any) -> None:
-    client.request.return_value = mock.MagicMock(json=lambda: "some result")
+    client.request.return_value = mock.MagicMock(content=b'"some result"')
     coll = TaskCollection(
         client=client,
         items={
@@ -124,25 +235,20 @@ async def test_task_collection_run(client: Any) -> None:
         },
         deployment_id="a_deployment",
     )
-    await coll.run(TaskDefinition(input="some input", task_id="test_id"))
+    res = await coll.run(TaskDefinition(input="some input", task_id="test_id"))
+    assert res == "some result"
     client.request.assert_awaited_with(
         "POST",
         "http://localhost:4501/deployments/a_deployment/tasks/run",
-        verify=True,
-        json={
-            "input": "some input",
-            "task_id": "test_id",
-            "session_id": None,
-            "service_id": None,
-        },
-        timeout=120.0,
+        content=TaskDefinition(input="some input", task_id="test_id").model_dump_json(),
+        headers={"Content-Type": "application/json"},
     )
 
 
 @pytest.mark.asyncio
 async def test_task_collection_create(client: Any) -> None:
     client.request.return_value = mock.MagicMock(
-        json=lambda: {"session_id": "a_session", "task_id": "test_id"}
+        content=b'{"session_id": "a_session", "task_id": "test_id"}'
     )
     coll = TaskCollection(
         client=client,
@@ -160,56 +266,200 @@ async def test_task_collection_create(client: Any) -> None:
     client.request.assert_awaited_with(
         "POST",
         "http://localhost:4501/deployments/a_deployment/tasks/create",
-        verify=True,
-        json={
-            "input": '{"arg": "test_input"}',
-            "task_id": "test_id",
-            "session_id": None,
-            "service_id": None,
-        },
-        timeout=120.0,
+        content=TaskDefinition(
+            input='{"arg": "test_input"}', task_id="test_id"
+        ).model_dump_json(),
+        headers={"Content-Type": "application/json"},
+    )
+
+
+@pytest.mark.asyncio
+async def test_task_collection_create_in_session(client: Any) -> None:
+    client.request.return_value = mock.MagicMock(
+        content=b'{"session_id": "a_session", "task_id": "test_id"}'
+    )
+    coll = TaskCollection(client=client, items={}, deployment_id="a_deployment")
+    task_def = TaskDefinition(input="{}", session_id="a_session")
+    task = await coll.create(task_def)
+    assert task.session_id == "a_session"
+    client.request.assert_awaited_with(
+        "POST",
+        "http://localhost:4501/deployments/a_deployment/tasks/create?session_id=a_session",
+        content=task_def.model_dump_json(),
+        headers={"Content-Type": "application/json"},
+    )
+
+
+@pytest.mark.asyncio
+async def test_task_collection_create_trusted(client: Any) -> None:
+    client.trust_server_responses = True
+    client.request.return_value = mock.MagicMock(
+        content=b'{"session_id": "a_session", "task_id": "test_id"}'
+    )
+    coll = TaskCollection(client=client, items={}, deployment_id="a_deployment")
+    task = await coll.create(TaskDefinition(input="{}", task_id="test_id"))
+    assert task.id == "test_id"
+    assert task.session_id == "a_session"
+    assert task.deployment_id == "a_deployment"
+
+
+@pytest.mark.asyncio
+async def test_task_collection_create_many(client: Any) -> None:
+    async def request(method: str, url: str, content: str, headers: Any) -> Any:
+        tds = TypeAdapter(list[TaskDefinition]).validate_json(content)
+        for td in tds:
+            td.session_id = td.session_id or "new_session"
+        return mock.MagicMock(content=TypeAdapter(list[TaskDefinition]).dump_json(tds))
+
+    client.request.side_effect = request
+    coll = TaskCollection(client=client, items={}, deployment_id="a_deployment")
+    tasks = [
+        TaskDefinition(input="{}", task_id=f"task_{i}", session_id="a_session")
+        for i in range(12)
+    ]
+    tasks.append(TaskDefinition(input="{}", task_id="task_12"))
+
+    res = await coll.create_many(tasks)
+
+    assert client.request.await_count == 2
+    assert [
+        len(TypeAdapter(list).validate_json(c.kwargs["content"]))
+        for c in client.request.await_args_list
+    ] == [10, 3]
+    client.request.assert_awaited_with(
+        "POST",
+        "http://localhost:4501/deployments/a_deployment/tasks/create_batch",
+        content=mock.ANY,
+        headers={"Content-Type": "application/json"},
     )
+    assert [t.id for t in res] == [f"task_{i}" for i in range(13)]
+    assert res[0].session_id == "a_session"
+    assert res[-1].session_id == "new_session"
+    assert all(t.deployment_id == "a_deployment" for t in res)
+
+
+@pytest.mark.asyncio
+async def test_task_collection_create_many_max_concurrent_requests(
+    client: Any,
+) -> None:
+    in_flight = max_in_flight = 0
+
+    async def request(method: str, url: str, content: str, headers: Any) -> Any:
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(in_flight, max_in_flight)
+        await asyncio.sleep(0)
+        in_flight -= 1
+        tds = TypeAdapter(list[TaskDefinition]).validate_json(content)
+        for td in tds:
+            td.session_id = "a_session"
+        return mock.MagicMock(content=TypeAdapter(list[TaskDefinition]).dump_json(tds))
+
+    client.request.side_effect = request
+    coll = TaskCollection(client=client, items={}, deployment_id="a_deployment")
+    with mock.patch("llama_deploy.client.models.apiserver.MAX_CONCURRENT_REQUESTS", 2):
+        res = await coll.create_many([TaskDefinition(input="{}") for _ in range(50)])
+
+    assert len(res) == 50
+    assert client.request.await_count == 5
+    assert max_in_flight == 2
+
+
+@pytest.mark.asyncio
+async def test_task_collection_create_many_partial_failure(client: Any) -> None:
+    async def request(method: str, url: str, content: str, headers: Any) -> Any:
+        tds = TypeAdapter(list[TaskDefinition]).validate_json(content)
+        if tds[0].task_id == "task_10":
+            raise httpx.HTTPStatusError(
+                "Session not found", request=mock.MagicMock(), response=mock.MagicMock()
+            )
+        for td in tds:
+            td.session_id = "a_session"
+        return mock.MagicMock(content=TypeAdapter(list[TaskDefinition]).dump_json(tds))
+
+    client.request.side_effect = request
+    coll = TaskCollection(client=client, items={}, deployment_id="a_deployment")
+    tasks = [TaskDefinition(input="{}", task_id=f"task_{i}") for i in range(30)]
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await coll.create_many(tasks)
+
+    # The batches before and after the failing one were submitted anyway
+    assert client.request.await_count == 3
 
 
 @pytest.mark.asyncio
 async def test_task_deployment_tasks(client: Any) -> None:
     d = Deployment(client=client, id="a_deployment")
-    res: list[TaskDefinition] = [
-        TaskDefinition(
-            input='{"arg": "input"}', task_id="a_task", session_id="a_session"
-        )
-    ]
-    client.request.return_value = mock.MagicMock(json=lambda: res)
+    res = TypeAdapter(list[TaskDefinition]).dump_json(
+        [
+            TaskDefinition(
+                input='{"arg": "input"}', task_id="a_task", session_id="a_session"
+            ),
+            TaskDefinition(
+                input='{"arg": "input"}', task_id="b_task", session_id="a_session"
+            ),
+        ]
+    )
+    client.request.return_value = mock.MagicMock(content=res)
 
-    await d.tasks.list()
+    tasks = await d.tasks.list()
 
     client.request.assert_awaited_with(
         "GET",
         "http://localhost:4501/deployments/a_deployment/tasks",
-        verify=True,
-        timeout=120.0,
     )
+    assert [t.id for t in tasks] == ["a_task", "b_task"]
+    assert tasks[1].session_id == "a_session"
+    assert tasks[1].deployment_id == "a_deployment"
+
+
+@pytest.mark.asyncio
+async def test_task_deployment_tasks_from_server(client: Any) -> None:
+    # Feed the client with what the API Server actually returns
+    server_deployment = mock.MagicMock(
+        _handlers={"a_task": mock.MagicMock()},
+        _handler_inputs={"a_task": '{"arg": "input"}'},
+        _handler_sessions={"a_task": "a_session"},
+    )
+    res = TypeAdapter(list[TaskDefinition]).dump_json(
+        await get_tasks(server_deployment)
+    )
+    client.request.return_value = mock.MagicMock(content=res)
+
+    tasks = await Deployment(client=client, id="a_deployment").tasks.list()
+
+    assert [(t.id, t.session_id) for t in tasks] == [("a_task", "a_session")]
+
+
+@pytest.mark.asyncio
+async def test_task_deployment_tasks_without_session(client: Any) -> None:
+    client.request.return_value = mock.MagicMock(
+        content=b'[{"input": "{}", "task_id": "a_task"}]'
+    )
+
+    with pytest.raises(ValidationError):
+        await Deployment(client=client, id="a_deployment").tasks.list()
 
 
 @pytest.mark.asyncio
 async def test_task_deployment_sessions(client: Any) -> None:
     d = Deployment(client=client, id="a_deployment")
-    res: list[SessionDefinition] = [SessionDefinition(session_id="a_session")]
-    client.request.return_value = mock.MagicMock(json=lambda: res)
+    client.request.return_value = mock.MagicMock(
+        content=b'[{"session_id": "a_session"}]'
+    )
 
     await d.sessions.list()
 
     client.request.assert_awaited_with(
         "GET",
         "http://localhost:4501/deployments/a_deployment/sessions",
-        verify=True,
-        timeout=120.0,
     )
 
 
 @pytest.mark.asyncio
 async def test_task_deployment_collection_create(client: Any) -> None:
-    client.request.return_value = mock.MagicMock(json=lambda: {"name": "deployment"})
+    client.request.return_value = mock.MagicMock(content=b'{"name": "deployment"}')
 
     coll = DeploymentCollection(client=client, items={})
     await coll.create(io.StringIO("some config"), base_path="tmp")
@@ -219,8 +469,6 @@ async def test_task_deployment_collection_create(client: Any) -> None:
         "http://localhost:4501/deployments/create",
         files={"config_file": "some config"},
         params={"reload": False, "local": False, "base_path": "tmp"},
-        verify=True,
-        timeout=120.0,
     )
 
 
@@ -228,15 +476,13 @@ async def test_task_deployment_collection_create(client: Any) -> None:
 async def test_task_deployment_collection_get(client: Any) -> None:
     d = Deployment(client=client, id="a_deployment")
     coll = DeploymentCollection(client=client, items={"a_deployment": d})
-    client.request.return_value = mock.MagicMock(json=lambda: {"a_deployment": "Up!"})
+    client.request.return_value = mock.MagicMock(content=b'{"name": "a_deployment"}')
 
     await coll.get("a_deployment")
 
     client.request.assert_awaited_with(
         "GET",
         "http://localhost:4501/deployments/a_deployment",
-        verify=True,
-        timeout=120.0,
     )
 
 
@@ -247,9 +493,7 @@ async def test_status_down(client: Any) -> None:
     apis = ApiServer(client=client, id="apiserver")
     res = await apis.status()
 
-    client.request.assert_awaited_with(
-        "GET", "http://localhost:4501/status/", verify=True, timeout=120.0
-    )
+    client.request.assert_awaited_with("GET", "http://localhost:4501/status/")
     assert res.status.value == "Down"
 
 
@@ -262,25 +506,19 @@ async def test_status_unhealthy(client: Any) -> None:
     apis = ApiServer(client=client, id="apiserver")
     res = await apis.status()
 
-    client.request.assert_awaited_with(
-        "GET", "http://localhost:4501/status/", verify=True, timeout=120.0
-    )
+    client.request.assert_awaited_with("GET", "http://localhost:4501/status/")
     assert res.status.value == "Unhealthy"
     assert res.status_message == "This is a drill."
 
 
 @pytest.mark.asyncio
 async def test_status_healthy_no_deployments(client: Any) -> None:
-    client.request.return_value = mock.MagicMock(
-        status_code=200, text="", json=lambda: {}
-    )
+    client.request.return_value = mock.MagicMock(status_code=200, content=b"{}")
 
     apis = ApiServer(client=client, id="apiserver")
     res = await apis.status()
 
-    client.request.assert_awaited_with(
-        "GET", "http://localhost:4501/status/", verify=True, timeout=120.0
-    )
+    client.request.assert_awaited_with("GET", "http://localhost:4501/status/")
     assert res.status.value == "Healthy"
     assert (
         res.status_message
@@ -291,15 +529,13 @@ async def test_status_healthy_no_deployments(client: Any) -> None:
 @pytest.mark.asyncio
 async def test_status_healthy(client: Any) -> None:
     client.request.return_value = mock.MagicMock(
-        status_code=200, text="", json=lambda: {"deployments": ["foo", "bar"]}
+        status_code=200, content=b'{"deployments": ["foo", "bar"]}'
     )
 
     apis = ApiServer(client=client, id="apiserver")
     res = await apis.status()
 
-    client.request.assert_awaited_with(
-        "GET", "http://localhost:4501/status/", verify=True, timeout=120.0
-    )
+    client.request.assert_awaited_with("GET", "http://localhost:4501/status/")
     assert res.status.value == "Healthy"
     assert (
         res.status_message
@@ -310,8 +546,62 @@ async def test_status_healthy(client: Any) -> None:
 @pytest.mark.asyncio
 async def test_deployments(client: Any) -> None:
     client.request.return_value = mock.MagicMock(
-        status_code=200, text="", json=lambda: {"deployments": ["foo", "bar"]}
+        status_code=200, content=b'[{"name": "foo"}, {"name": "bar"}]'
     )
     apis = ApiServer(client=client, id="apiserver")
-    await apis.deployments.list()
+    deployments = await apis.deployments.list()
     client.request.assert_awaited_with("GET", "http://localhost:4501/deployments/")
+    assert [d.id for d in deployments] == ["foo", "bar"]
+
+
+@pytest.mark.asyncio
+async def test_all_with_children(client: Any) -> None:
+    responses = {
+        "http://localhost:4501/deployments/": b'[{"name": "foo"}, {"name": "bar"}]',
+        "http://localhost:4501/deployments/foo/tasks": b'[{"input": "", "task_id": "t1", "session_id": "s1"}]',
+        "http://localhost:4501/deployments/foo/sessions": b'[{"session_id": "s1"}]',
+        "http://localhost:4501/deployments/bar/tasks": b"[]",
+        "http://localhost:4501/deployments/bar/sessions": b"[]",
+    }
+
+    async def request(method: str, url: str) -> Any:
+        return mock.MagicMock(content=responses[url])
+
+    client.request.side_effect = request
+    apis = ApiServer(client=client, id="apiserver")
+    res = await apis.all_with_children()
+
+    assert client.request.await_count == 5
+    assert [d.id for d, _, _ in res] == ["foo", "bar"]
+    _, tasks, sessions = res[0]
+    assert [(t.id, t.session_id, t.deployment_id) for t in tasks] == [
+        ("t1", "s1", "foo")
+    ]
+    assert sessions == [SessionDefinition(session_id="s1")]
+    assert res[1][1:] == ([], [])
+
+
+@pytest.mark.asyncio
+async def test_all_with_children_max_concurrent_requests(client: Any) -> None:
+    in_flight = max_in_flight = 0
+
+    async def request(method: str, url: str) -> Any:
+        nonlocal in_flight, max_in_flight
+        if url == "http://localhost:4501/deployments/":
+            names = [{"name": f"d{i}"} for i in range(10)]
+            return mock.MagicMock(content=json.dumps(names).encode())
+
+        in_flight += 1
+        max_in_flight = max(in_flight, max_in_flight)
+        await asyncio.sleep(0)
+        in_flight -= 1
+        return mock.MagicMock(content=b"[]")
+
+    client.request.side_effect = request
+    apis = ApiServer(client=client, id="apiserver")
+    with mock.patch("llama_deploy.client.models.apiserver.MAX_CONCURRENT_REQUESTS", 3):
+        res = await apis.all_with_children()
+
+    assert len(res) == 10
+    assert client.request.await_count == 21
+    assert max_in_flight == 3
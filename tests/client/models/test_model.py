@@ -2,10 +2,12 @@ import asyncio
 from typing import AsyncGenerator
 
 import pytest
+from pydantic import ValidationError
 
 from llama_deploy.client import Client
 from llama_deploy.client.models import Collection, Model
 from llama_deploy.client.models.model import _async_gen_to_list, make_sync
+from llama_deploy.types import SessionDefinition
 
 
 class SomeAsyncModel(Model):
@@ -58,3 +60,32 @@ async def test__async_gen_to_list() -> None:
         yield "two"
 
     assert await _async_gen_to_list(aiter_lines()) == ["one", "two"]
+
+
+def test__load() -> None:
+    content = b'{"session_id": "foo", "task_ids": ["bar"]}'
+    m = SomeAsyncModel(client=Client(), id="foo")
+    session_def = m._load(SessionDefinition, content)
+    assert session_def == SessionDefinition(session_id="foo", task_ids=["bar"])
+    with pytest.raises(ValidationError):
+        m._load(SessionDefinition, b'{"session_id": 42}')
+
+    m = SomeAsyncModel(client=Client(trust_server_responses=True), id="foo")
+    assert m._load(SessionDefinition, content) == session_def
+    # No validation happens
+    assert m._load(SessionDefinition, b'{"session_id": 42}').session_id == 42
+
+
+def test__load_list() -> None:
+    content = b'[{"session_id": "foo"}, {"session_id": "bar"}]'
+    expected = [
+        SessionDefinition(session_id="foo"),
+        SessionDefinition(session_id="bar"),
+    ]
+    m = SomeAsyncModel(client=Client(), id="foo")
+    assert m._load_list(SessionDefinition, content) == expected
+    with pytest.raises(ValidationError):
+        m._load_list(SessionDefinition, b'[{"session_id": 42}]')
+
+    m = SomeAsyncModel(client=Client(trust_server_responses=True), id="foo")
+    assert m._load_list(SessionDefinition, content) == expected
@@ -1,8 +1,15 @@
+import asyncio
+import gc
+import threading
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator
 from unittest import mock
 
 import pytest
 
 from llama_deploy.client import Client
+from llama_deploy.client.base import _POOL_LIMITS
 from llama_deploy.client.client import _SyncClient
 from llama_deploy.client.models import ApiServer
 
@@ -13,6 +20,7 @@ def test_client_init_default() -> None:
     assert c.disable_ssl is False
     assert c.timeout == 120.0
     assert c.poll_interval == 0.5
+    assert c.trust_server_responses is False
 
 
 def test_client_init_settings() -> None:
@@ -56,5 +64,135 @@ async def test_client_request() -> None:
 
         c = Client()
         await c.request("GET", "http://example.com", verify=False)
-        _httpx.AsyncClient.assert_called_with(verify=False)
+        _httpx.AsyncClient.assert_called_with(
+            verify=False, http2=True, limits=_POOL_LIMITS
+        )
         mocked_response.raise_for_status.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_client_request_defaults() -> None:
+    with mock.patch("llama_deploy.client.base.httpx") as _httpx:
+        client = _httpx.AsyncClient.return_value.__aenter__.return_value
+        client.request = mock.AsyncMock(return_value=mock.MagicMock())
+
+        c = Client(disable_ssl=True, timeout=42.0)
+        await c.request("GET", "http://example.com")
+        _httpx.AsyncClient.assert_called_once()
+        assert _httpx.AsyncClient.call_args.kwargs["verify"] is False
+        client.request.assert_awaited_with("GET", "http://example.com", timeout=42.0)
+        client.request.return_value.raise_for_status.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_client_request_reuses_pool() -> None:
+    with mock.patch("llama_deploy.client.base.httpx") as _httpx:
+        client = _httpx.AsyncClient.return_value
+        client.is_closed = False
+        client.request = mock.AsyncMock(return_value=mock.MagicMock())
+        client.aclose = mock.AsyncMock()
+        # Requests that can't use the pool get a client of their own
+        _httpx.AsyncClient.return_value.__aenter__.return_value = client
+
+        async with Client() as c:
+            await c.request("GET", "http://example.com")
+            await c.request("GET", "http://example.com")
+            _httpx.AsyncClient.assert_called_once()
+            assert client.request.await_count == 2
+            # A different `verify` can't be served by the pool
+            await c.request("GET", "http://example.com", verify=False)
+            assert _httpx.AsyncClient.call_count == 2
+
+        client.aclose.assert_awaited_once()
+        await c.request("GET", "http://example.com")
+        assert _httpx.AsyncClient.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_client_nested_pool() -> None:
+    with mock.patch("llama_deploy.client.base.httpx") as _httpx:
+        client = _httpx.AsyncClient.return_value
+        client.is_closed = False
+        client.request = mock.AsyncMock(return_value=mock.MagicMock())
+        client.aclose = mock.AsyncMock()
+
+        async with Client() as c:
+            async with c:
+                await c.request("GET", "http://example.com")
+            # Leaving the inner block keeps the pool open for the outer one
+            client.aclose.assert_not_awaited()
+            await c.request("GET", "http://example.com")
+            _httpx.AsyncClient.assert_called_once()
+
+        client.aclose.assert_awaited_once()
+
+
+def test_client_pool_in_another_loop() -> None:
+    c = Client()
+
+    async def open_pool() -> None:
+        await c.__aenter__()
+
+    async def nested() -> None:
+        async with c:
+            pass
+
+    asyncio.run(open_pool())
+    with pytest.raises(RuntimeError, match="another event loop"):
+        asyncio.run(nested())
+    asyncio.run(c.aclose())
+
+
+class _StatusHandler(BaseHTTPRequestHandler):
+    # Keep the connections alive, so that a client leaving them open would be detected
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        body = b'{"deployments": []}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def apiserver_url() -> Iterator[str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StatusHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_client_no_connections_left_open(apiserver_url: str) -> None:
+    c = Client(api_server_url=apiserver_url)
+
+    async def status_in_pool() -> None:
+        async with c:
+            await c.apiserver.status()
+            await c.apiserver.status()
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", ResourceWarning)
+        # Every call runs in a different event loop
+        c.sync.apiserver.status()
+        c.sync.apiserver.status()
+        asyncio.run(c.apiserver.status())
+        asyncio.run(c.apiserver.status())
+        asyncio.run(status_in_pool())
+        asyncio.run(status_in_pool())
+        gc.collect()
+
+    # asyncio.run() drops the event loop left behind by the async tests, ignore it
+    leaks = [
+        str(w.message)
+        for w in caught
+        if issubclass(w.category, ResourceWarning)
+        and not str(w.message).startswith("unclosed event loop")
+    ]
+    assert leaks == []